@@ -23,10 +23,13 @@ import bpy, os
 import numpy as np
 
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from enum import IntEnum
+from functools import lru_cache
 from pathlib import Path
 from struct import Struct
-from typing import BinaryIO, List, NamedTuple, Optional, Union
+from typing import BinaryIO, List, NamedTuple, Optional, Tuple, Union
 from .cmp import ColorMap
 
 file_magic        = b'MAT '
@@ -106,13 +109,7 @@ class MatMipmapHeader(NamedTuple):
 
 mmm_serf = Struct('<6i')
 
-class Pixel(NamedTuple):
-    red: float
-    green: float
-    blue: float
-    alpha: float
-
-Pixels = List[Pixel]
+Pixels = np.ndarray # float32 RGBA image of shape (height, width, 4) in linear space
 
 class Mipmap(NamedTuple):
     width: int
@@ -120,13 +117,20 @@ class Mipmap(NamedTuple):
     color_info: ColorFormat
     pixel_data_array: Optional[List[Pixels]]
 
-_linear_coef = 1.0 / 255.0
+_linear_coef = np.float32(1.0 / 255.0)
+
+def _to_linear(img: np.ndarray) -> np.ndarray:
+    """
+    Converts 8 bit color channels of `img` to contiguous float32 channels in linear space.
+    """
+    img = img.astype(np.float32, order='C')
+    img *= _linear_coef
+    return img
 
 def _read_header(f: BinaryIO):
-    rh  = bytearray(f.read(mh_serf.size))
-    rcf = bytearray(f.read(cf_serf.size))
-    cf  = ColorFormat._make(cf_serf.unpack(rcf))
-    h   = MatHeader(*mh_serf.unpack(rh), cf)
+    buf = f.read(mh_serf.size + cf_serf.size)
+    cf  = ColorFormat._make(cf_serf.unpack_from(buf, mh_serf.size))
+    h   = MatHeader(*mh_serf.unpack_from(buf, 0), cf)
 
     if h.magic != file_magic:
         raise ImportError("Invalid MAT file")
@@ -145,29 +149,33 @@ def _read_header(f: BinaryIO):
     return h
 
 def _read_records(f: BinaryIO, h: MatHeader):
-    records = []
-    if h.type == MatType.Color:
-        for _ in range(h.record_count):
-            records.append(MatColorRecord._make(mcr_serf.unpack(f.read(mcr_serf.size))))
-    else:
-        for _ in range(h.record_count):
-            records.append(MatTextureRecord._make(mtr_serf.unpack(f.read(mtr_serf.size))))
-    return records
+    rtype, serf = (MatColorRecord, mcr_serf) if h.type == MatType.Color else (MatTextureRecord, mtr_serf)
+    buf = f.read(h.record_count * serf.size)
+    return [rtype._make(r) for r in serf.iter_unpack(buf)]
+
+def _get_palette_lut(cmp: ColorMap) -> np.ndarray:
+    """
+    Returns palette of `cmp` as RGBA lookup table of 256 packed 32 bit colors.
+    The table is built once and cached on `cmp`.
+    """
+    lut = getattr(cmp, '_rgba_lut', None)
+    if lut is None:
+        rgba = np.empty((256, 4), dtype=np.uint8)
+        rgba[:, :3] = cmp.palette[:256]
+        rgba[:, 3]  = 255
+        lut = cmp._rgba_lut = rgba.view(np.uint32).ravel()
+    return lut
 
 def _decode_indexed_pixel_data(pd, width: int, height: int, cmp: ColorMap, transparent_color: Optional[int] = None) -> Pixels:
     idx = np.frombuffer(pd, dtype=np.uint8) # image index buffer
-    pal = np.insert(cmp.palette, 3, 255, axis=1) # expand palette to contain 255 for alpha
+    lut = _get_palette_lut(cmp)
     if transparent_color is not None:
-        pal[transparent_color][3] = 0
+        lut = lut.copy()
+        lut.view(np.uint8).reshape((-1, 4))[transparent_color, 3] = 0
 
-    # Convert indexed color to RGB
-    raw_img = pal[idx]
-    raw_img = raw_img.flatten().view(np.uint32)
-
-    raw_img = np.flip(
-        raw_img.view(np.uint8).reshape((height, width, 4)), axis=0
-    ).flatten() * _linear_coef # get byte array and convert to linear
-    return raw_img
+    # Convert indexed color to RGBA and flip image over Y-axis (height)
+    raw_img = lut.take(idx).view(np.uint8).reshape((height, width, 4))[::-1]
+    return _to_linear(raw_img)
 
 def _get_pixel_data_size(width: int, height: int, bpp: int) -> int:
     return int(abs(width * height) * (bpp /8))
@@ -175,51 +183,79 @@ def _get_pixel_data_size(width: int, height: int, bpp: int) -> int:
 def _get_color_mask(bpc: int) -> int:
     return 0xFFFFFFFF >> (32 - bpc)
 
+@lru_cache(maxsize=None)
+def _get_byte_channels(ci: ColorFormat) -> Optional[Tuple[int, int, int, Optional[int]]]:
+    """
+    Returns byte offsets of red, green, blue and alpha (None if no alpha) channel
+    in pixel when all color channels of `ci` are whole bytes, otherwise None.
+    """
+    def is_byte(bpp: int, shl: int, shr: int) -> bool:
+        return bpp == 8 and shl % 8 == 0 and shr == 0
+
+    if ci.bpp not in (24, 32) \
+        or not is_byte(ci.red_bpp,   ci.red_shl,   ci.red_shr)   \
+        or not is_byte(ci.green_bpp, ci.green_shl, ci.green_shr) \
+        or not is_byte(ci.blue_bpp,  ci.blue_shl,  ci.blue_shr):
+        return None
+    if ci.alpha_bpp == 0:
+        return (ci.red_shl // 8, ci.green_shl // 8, ci.blue_shl // 8, None)
+    if is_byte(ci.alpha_bpp, ci.alpha_shl, ci.alpha_shr):
+        return (ci.red_shl // 8, ci.green_shl // 8, ci.blue_shl // 8, ci.alpha_shl // 8)
+    return None
+
 def _decode_rgba_pixel_data(pd, width: int, height: int, ci: ColorFormat) -> Pixels:
-    type = np.uint8 if (ci.bpp == 8 or ci.bpp == 24) else np.uint16 if ci.bpp == 16 else np.uint32
-    raw_img = np.frombuffer(pd, type)
-    if ci.bpp == 24: # expand array to contain 255 for alpha
-        raw_img = np.insert(raw_img.reshape((-1, 3)), 3, 255, axis=1) \
-            .flatten().view(np.uint32)
-    raw_img = raw_img.astype(np.uint32)
-
-    def decode_alpha(img):
-        a = 255
-        if ci.alpha_bpp > 0:
-            a = ((img >> ci.alpha_shl) & am) << ci.alpha_shr
-            if ci.alpha_bpp == 1: # clamp rgb5551 to 0 or 255
-                np.clip(a * 255, 0, 255, a) # faster than a[a>0] = 255
-        return a
+    bc = _get_byte_channels(ci)
+    if bc is not None: # RGB888, RGBA8888 ..., gather channel bytes directly
+        px  = np.frombuffer(pd, np.uint8).reshape((height, width, ci.bpp // 8))[::-1]
+        out = np.empty((height, width, 4), dtype=np.uint8)
+        out[..., :3] = px[..., bc[:3]]
+        out[..., 3]  = px[..., bc[3]] if bc[3] is not None else 255
+        return _to_linear(out)
+
+    if ci.bpp == 24: # pack 3 byte pixels into 32 bit words with 255 for alpha
+        rgb = np.frombuffer(pd, np.uint8).reshape((-1, 3)).astype(np.uint32)
+        raw_img = rgb[:, 0] | (rgb[:, 1] << 8) | (rgb[:, 2] << 16) | np.uint32(0xFF000000)
+    else:
+        type = np.uint8 if ci.bpp == 8 else np.uint16 if ci.bpp == 16 else np.uint32
+        raw_img = np.frombuffer(pd, type).astype(np.uint32, copy=False)
+
+    # Flip image over Y-axis (height) as a view, so each channel
+    # is decoded straight into its final place in the output image
+    raw_img = raw_img.reshape((height, width))[::-1]
+    out     = np.empty((height, width, 4), dtype=np.uint8)
 
     # Decode image to 32 bit
     rm = _get_color_mask(ci.red_bpp)
     gm = _get_color_mask(ci.green_bpp)
     bm = _get_color_mask(ci.blue_bpp)
     am = _get_color_mask(ci.alpha_bpp)
-    raw_img = ((raw_img >> ci.red_shl)   & rm)  << ci.red_shr         | \
-              ((raw_img >> ci.green_shl) & gm)  << ci.green_shr << 8  | \
-              ((raw_img >> ci.blue_shl)  & bm)  << ci.blue_shr  << 16 | \
-              decode_alpha(raw_img) << 24
-
-    # Flip image over Y-axis (height) and convert to linear
-    raw_img = np.flip(
-        raw_img.view(np.uint8).reshape((height, width, 4)), axis=[0]
-    ).flatten() * _linear_coef # get byte array and convert to linear
-    return raw_img
-
-def _read_pixel_data(f: BinaryIO, width: int, height: int, ci: ColorFormat, cmp: Optional[ColorMap] = None, transparent_color: Optional[int] = None) -> Pixels:
-    pd_size = _get_pixel_data_size(width, height, ci.bpp)
-    pd = bytearray(f.read(pd_size))
+    out[..., 0] = ((raw_img >> ci.red_shl)   & rm) << ci.red_shr
+    out[..., 1] = ((raw_img >> ci.green_shl) & gm) << ci.green_shr
+    out[..., 2] = ((raw_img >> ci.blue_shl)  & bm) << ci.blue_shr
+    if ci.alpha_bpp == 1: # clamp rgb5551 to 0 or 255
+        out[..., 3] = np.where((raw_img >> ci.alpha_shl) & am, 255, 0)
+    elif ci.alpha_bpp > 0:
+        out[..., 3] = ((raw_img >> ci.alpha_shl) & am) << ci.alpha_shr
+    else:
+        out[..., 3] = 255
+
+    return _to_linear(out)
+
+def _decode_pixel_data(pd, width: int, height: int, ci: ColorFormat, cmp: Optional[ColorMap] = None, transparent_color: Optional[int] = None) -> Optional[Pixels]:
     if ci.color_mode == ColorMode.Indexed or ci.bpp == 8:
         if not cmp:
             print("  Missing ColorMap, pixel data not decoded!")
-            return []
+            return None
         else:
             return _decode_indexed_pixel_data(pd, width, height, cmp, transparent_color)
     # RGB(A)
     return _decode_rgba_pixel_data(pd, width, height, ci)
 
-def _read_mipmap(f: BinaryIO, cf: ColorFormat, cmp: Optional[ColorMap]):
+def _read_mipmap(f: BinaryIO, cf: ColorFormat, cmp: Optional[ColorMap]) -> Tuple[MatMipmapHeader, bytes]:
+    """
+    Reads mipmap header and raw pixel data of all mipmap levels.
+    Use `_decode_mipmap` to decode returned pixel data.
+    """
     rh = mmm_serf.unpack(f.read(mmm_serf.size))
     h  = MatMipmapHeader(*rh)
 
@@ -229,35 +265,39 @@ def _read_mipmap(f: BinaryIO, cf: ColorFormat, cmp: Optional[ColorMap]):
         if len(cmp.palette) < 256:
             raise ImportError("ColorMap has less than 256 colors")
 
-    mipmap = Mipmap(
+    # Read pixel data of all mipmap levels at once.
+    # Each level is half the size of the previous one.
+    pd_size = sum(_get_pixel_data_size(h.width >> l, h.height >> l, cf.bpp) for l in range(h.levels))
+    return h, f.read(pd_size)
+
+def _decode_mipmap(h: MatMipmapHeader, pd: bytes, cf: ColorFormat, cmp: Optional[ColorMap], levels: Optional[int] = None) -> Mipmap:
+    """
+    Decodes first `levels` mipmap levels of pixel data `pd` or all levels if `levels` is None.
+    Levels which are not decoded are set to None.
+    """
+    pd = memoryview(pd)
+    pixel_data_array: List[Optional[Pixels]] = [None] * h.levels
+    offset = 0
+    for l in range(h.levels if levels is None else min(levels, h.levels)):
+        width, height = h.width >> l, h.height >> l
+        size = _get_pixel_data_size(width, height, cf.bpp)
+        pixel_data_array[l] = _decode_pixel_data(pd[offset:offset + size], width, height, cf, cmp)
+        offset += size
+
+    return Mipmap(
         width=h.width,
         height=h.height,
         color_info=cf,
-        pixel_data_array=None
+        pixel_data_array=pixel_data_array
     )
 
-    if cf.color_mode == ColorMode.Indexed:
-        pixel_data_array = []
-        for _ in range(h.levels):
-            pixel_data = np.frombuffer(f.read(h.width * h.height), dtype=np.uint8)
-            rgba_data = [Pixel(
-                red=cmp.palette[p].r * _linear_coef,
-                green=cmp.palette[p].g * _linear_coef,
-                blue=cmp.palette[p].b * _linear_coef,
-                alpha=1.0
-            ) for p in pixel_data]
-            pixel_data_array.append(rgba_data)
-        mipmap = mipmap._replace(pixel_data_array=pixel_data_array)
-
-    return mipmap
-
 def _get_tex_name(idx: int, mat_name: str) -> str:
     name = os.path.splitext(mat_name)[0]
     if idx > 0:
         name += '_cel_' + str(idx)
     return name
 
-def _mat_add_new_texture(mat: bpy.types.Material, width: int, height: int, texIdx: int, pixdata: Optional[Pixels], hasTransparency: bool):
+def _mat_add_new_texture(mat: bpy.types.Material, width: int, height: int, texIdx: int, pixdata: Optional[np.ndarray], hasTransparency: bool):
     img_name = _get_tex_name(texIdx, mat.name)
     if not img_name in bpy.data.images:
         img = bpy.data.images.new(
@@ -270,15 +310,8 @@ def _mat_add_new_texture(mat: bpy.types.Material, width: int, height: int, texId
         if img.has_data:
             img.scale(width, height)
 
-    if pixdata is not None:
-        flipped_pixdata = []
-        for y in range(height):
-            for x in range(width):
-                index = (height - y - 1) * width + x
-                pixel = pixdata[index]
-                flipped_pixdata.extend([pixel.red, pixel.green, pixel.blue, pixel.alpha])
-
-        img.pixels = flipped_pixdata
+    if pixdata is not None: # decoded (height, width, 4) image, already flipped and in linear space
+        img.pixels.foreach_set(np.ascontiguousarray(pixdata, dtype=np.float32).ravel())
         img.update()
     else:
         img.generated_type   = 'UV_GRID'
@@ -315,11 +348,10 @@ def _max_cels(len: int) -> int:
 def _make_color_textures(mat: bpy.types.Material, records, cmp: Optional[ColorMap]): # cmp is None then blank 64x64 textures is created
     # Creates 1 palette pixel color texture of size color_tex_height * color_tex_width
     for idx, r in zip(range(_max_cels(len(records))), records):
-        pixmap: Optional[Pixels] = None
+        pixmap: Optional[np.ndarray] = None
         if cmp:
-            rgba   = (cmp.palette[r.color_index]) + (255,)
-            pixmap = np.full((color_tex_height, color_tex_width, 4), rgba) \
-                .flatten() * _linear_coef # flatten and convert to linear
+            rgba   = np.array(cmp.palette[r.color_index] + (255,), dtype=np.float32) * _linear_coef # convert to linear
+            pixmap = np.broadcast_to(rgba, (color_tex_height, color_tex_width, 4))
         else:
             print("  Missing ColorMap, only texture size will be loaded!")
 
@@ -362,9 +394,15 @@ def importMat(filePath: Union[Path, str], cmp: Optional[ColorMap] = None) -> bpy
         use_transparency = True if h.color_info.alpha_bpp > 0 else False
         mat.blend_method = 'BLEND' if use_transparency else 'OPAQUE'
         mat.alpha_threshold = 0.0
-        for i in range(0, _max_cels(h.texture_count)):
-            mm = _read_mipmap(f, h.color_info, cmp)
-            _mat_add_new_texture(mat, mm.width, mm.height, i, mm.pixel_data_array[0] if mm.pixel_data_array else None, hasTransparency=use_transparency)
+        # Read all cels first and decode them in parallel,
+        # while the textures are made on the main thread as cels get decoded
+        cels = [_read_mipmap(f, h.color_info, cmp) for _ in range(_max_cels(h.texture_count))]
+        decode = lambda c: _decode_mipmap(*c, h.color_info, cmp, levels=1) # only the first level is used
+        # Decode multiple cels in parallel, most of MATs have single cel which is decoded inline
+        with ThreadPoolExecutor() if len(cels) > 1 else nullcontext() as executor:
+            mipmaps = executor.map(decode, cels) if executor else map(decode, cels)
+            for i, mm in enumerate(mipmaps):
+                _mat_add_new_texture(mat, mm.width, mm.height, i, mm.pixel_data_array[0] if mm.pixel_data_array else None, hasTransparency=use_transparency)
 
     mat.node_tree.nodes['Principled BSDF'].inputs['Base Color'].default_value = (1, 1, 1, 1)
     return mat
@@ -20,9 +20,11 @@
 # SOFTWARE.
 
 import bpy, bmesh, mathutils, os
+import numpy as np
+
 from sith.types import BenchmarkMeter
 from sith.utils import *
-from typing import List, Union
+from typing import Dict, List, Optional, Union
 from pathlib import Path
 
 from . import model3doLoader
@@ -57,8 +59,7 @@ def import3do(file_path: Union[Path, str], mat_dirs: List[Union[Path, str]] = []
             clearAllScenes()
 
         # Load model's textures
-        mat_dirs = [str(mat_dir) for mat_dir in mat_dirs]  # Convert to strings
-        file_path_str = str(file_path)  # Convert file_path to string
+        file_path_str = os.fspath(file_path)
         mat_dirs = _convert_to_absolute_paths(mat_dirs, os.path.dirname(file_path_str))  # convert relative paths to file_path base folder
         with BenchmarkMeter('Info: \nLoaded materials from files in {:.4f} sec.', enabled=False):
             importMaterials(model.materials, getDefaultMatFolders(file_path_str) + mat_dirs, cmp)
@@ -89,27 +90,20 @@ def import3do(file_path: Union[Path, str], mat_dirs: List[Union[Path, str]] = []
         return baseObj
 
 
-def _convert_to_absolute_paths(path_list: List[Union[Path, str]], cwd: Union[Path, str]) -> List[Union[Path, str]]:
-    absolute_paths: List[Union[Path, str]] = []
-    for path in path_list:
-        if not os.path.isabs(path):
-            # Convert to absolute path if it's relative
-            absolute_path = os.path.abspath(Path(cwd) / path)
-        else:
-            # Keep the path as it is if it's already absolute
-            absolute_path = path
-        absolute_paths.append(absolute_path)
-    return absolute_paths
+def _convert_to_absolute_paths(path_list: List[Union[Path, str]], cwd: Union[Path, str]) -> List[str]:
+    # Keep the path as it is if it's already absolute, otherwise make it relative to cwd
+    cwd = os.path.abspath(cwd)
+    path_list = map(os.fspath, path_list)
+    return [path if os.path.isabs(path) else os.path.normpath(os.path.join(cwd, path)) for path in path_list]
 
 def _set_obj_rotation(obj, rotation):
     objSetRotation(obj, rotation)
 
 def _set_obj_pivot(obj, pivot):
-    pvec = mathutils.Vector(pivot)
-    if  obj.type == 'MESH' and obj.data is not None and pvec.length > 0:
-        obj.data.transform(mathutils.Matrix.Translation(pvec))
+    if obj.type == 'MESH' and obj.data is not None and any(pivot):
+        obj.data.transform(mathutils.Matrix.Translation(pivot))
 
-def _make_radius_obj(name: str, parent, radius: float):
+def _make_radius_obj(name: str, parent, radius: float, bm: Optional[bmesh.types.BMesh] = None):
     if name in bpy.data.meshes:
         mesh = bpy.data.meshes[name]
     else:
@@ -122,149 +116,175 @@ def _make_radius_obj(name: str, parent, radius: float):
         ro.parent = parent
         bpy.context.collection.objects.link(ro)
 
-    bm = bmesh.new()
+    # Reuse caller's bmesh when given, otherwise make a temporary one
+    own_bm = bm is None
+    if own_bm:
+        bm = bmesh.new()
+    else:
+        bm.clear()
     bmesh.ops.create_uvsphere(bm, u_segments=32, v_segments=16, radius=radius)
     bm.to_mesh(mesh)
-    bm.free()
+    if own_bm:
+        bm.free()
 
 def _set_model_radius(obj: bpy.types.Object, radius: float):
     _make_radius_obj(kModelRadius + obj.name, obj, radius)
 
-def _set_mesh_radius(obj, radius: float):
-    _make_radius_obj(kMeshRadius + obj.name, obj, radius)
-
-def _make_mesh(mesh3do: Mesh3do, uvAbsolute: bool, vertexColors: bool, mat_list: List):
-    mesh = bpy.data.meshes.new(mesh3do.name)
+def _set_mesh_radius(obj, radius: float, bm: Optional[bmesh.types.BMesh] = None):
+    _make_radius_obj(kMeshRadius + obj.name, obj, radius, bm)
 
-    faces: List[List[int]] = []
-    for face in mesh3do.faces:
-        faces += [face.vertexIdxs]
-
-    # Construct mesh
-    mesh.from_pydata(mesh3do.vertices, [], faces)
-
-    bm = bmesh.new()
-    bm.from_mesh(mesh)
-    bm.faces.ensure_lookup_table()
-
-    vert_color = bm.loops.layers.color.verify()
-    uv_layer = bm.loops.layers.uv.verify()
-    bmMeshInit3doLayers(bm)
-
-    # Set mesh materials and UV map
-    for face in bm.faces:
-        face3do = mesh3do.faces[face.index]
-
-        # Set custom property for face type, geometry, light, texture mode
-        bmFaceSetType(face, bm, face3do.type)
-        bmFaceSetGeometryMode(face, bm, face3do.geometryMode)
-        bmFaceSetLightMode(face, bm, face3do.lightMode)
-        bmFaceSetTextureMode(face, bm, face3do.textureMode)
-        bmFaceSetExtraLight(face, bm, face3do.color)
-
-        # Set face normal
-        face.normal = mesh3do.faces[face.index].normal
-
-        # Set face material index
-        mat = None
-        if face3do.materialIdx > -1:
-            mat_name = mat_list[face3do.materialIdx]
-            mat = getGlobalMaterial(mat_name)
-            if mat is None:
-                print(f"\nWarning: Could not find or load material file '{mat_name}'")
-                mat = makeNewGlobalMaterial(mat_name)
-
-        if mat:
-            if mat.name not in mesh.materials:
-                mesh.materials.append(mat)
-            face.material_index = mesh.materials.find(mat.name)
-            # Set backface culling for the material
-            mat.use_backface_culling = False
-
-        # Set vertices color and face uv map
-        for idx, loop in enumerate(face.loops):  # update vertices
-            vidx = loop.vert.index
-            loop.vert.normal = mesh3do.normals[vidx]
-            if vertexColors:
-                loop[vert_color] = mesh3do.vertexColors[vidx]
-
-            # Set UV coordinates
-            luv = loop[uv_layer]
-            uvIdx = face3do.uvIdxs[idx]
-            if uvIdx < len(mesh3do.uvs):
-                uv = mesh3do.uvs[uvIdx]
-                if uvAbsolute:  # Remove image size from uv
-                    if mat and mat.node_tree.nodes:
-                        for node in mat.node_tree.nodes:
-                            if node.type == 'TEX_IMAGE':
-                                img = node.image
-                                if img is not None:
-                                    uv = vectorDivide(mathutils.Vector(uv), mathutils.Vector(img.size))
-                                break
-                    elif face3do.materialIdx > -1:
-                        print(f"\nWarning: Could not remove image size from UV coord due to missing image! mesh:'{mesh3do.name}' face:{face.index} uvIdx:{uvIdx}")
-                luv.uv = (uv.x, -uv.y)  # Note: Flipped v
-            elif uvIdx > -1:
-                print(f"Warning: UV index out of range {uvIdx} >= {len(mesh3do.uvs)}! mesh:'{mesh3do.name}' face:{face.index}")
+def _get_mat_image(mat: bpy.types.Material) -> Optional[bpy.types.Image]:
+    if mat.node_tree:
+        for node in mat.node_tree.nodes:
+            if node.type == 'TEX_IMAGE':
+                return node.image
+    return None
 
-    bm.to_mesh(mesh)
-    bm.free()
-
-    mesh.update()
+def _make_mesh(mesh3do: Mesh3do, uvAbsolute: bool, vertexColors: bool, mat_list: List, mat_images: Optional[Dict[int, Optional[bpy.types.Image]]] = None):
+    mesh = bpy.data.meshes.new(mesh3do.name)
+    if mat_images is None: # model material index -> image cache, can be shared between meshes of the same model
+        mat_images = {}
+
+    # Resolve mesh materials and their images once, in order of the first use.
+    # Mesh material slot and image size are stored per model material index,
+    # the extra last row is for faces without material (materialIdx == -1).
+    mat_slots = np.zeros(len(mat_list) + 1, dtype=np.int32)
+    # Image size is used to remove image size from uv when uvAbsolute.
+    mat_uv_sizes = np.ones((len(mat_list) + 1, 2), dtype=np.float32)
+    for matIdx in dict.fromkeys(f.materialIdx for f in mesh3do.faces if f.materialIdx > -1):
+        mat_name = mat_list[matIdx]
+        mat = getGlobalMaterial(mat_name)
+        if mat is None:
+            print(f"\nWarning: Could not find or load material file '{mat_name}'")
+            mat = makeNewGlobalMaterial(mat_name)
+
+        if mat.name not in mesh.materials:
+            mesh.materials.append(mat)
+        mat_slots[matIdx] = mesh.materials.find(mat.name)
+        # Set backface culling for the material
+        mat.use_backface_culling = False
+
+        if uvAbsolute:
+            if matIdx not in mat_images:
+                mat_images[matIdx] = _get_mat_image(mat)
+            img = mat_images[matIdx]
+            if img is not None and img.size[0] > 0 and img.size[1] > 0:
+                mat_uv_sizes[matIdx] = img.size
+            else:
+                print(f"\nWarning: Could not remove image size from UV coords due to missing image! mesh:'{mesh3do.name}' material:'{mat_name}'")
+
+    # Construct mesh.
+    # Mesh loops are ordered by faces, the same as vertex and uv indices of 3DO faces.
+    face_sizes    = np.fromiter((len(f.vertexIdxs) for f in mesh3do.faces), dtype=np.int32, count=len(mesh3do.faces))
+    num_loops     = int(face_sizes.sum())
+    loop_vidxs    = np.fromiter((i for f in mesh3do.faces for i in f.vertexIdxs), dtype=np.int32, count=num_loops)
+    loop_uvidxs   = np.fromiter((i for f in mesh3do.faces for i in f.uvIdxs), dtype=np.int32, count=num_loops)
+
+    # Per face model material is needed only to set face material slot
+    # when mesh has multiple materials, or to scale uv by image size.
+    multi_mat = len(mesh.materials) > 1
+    if multi_mat or uvAbsolute:
+        face_mat_idxs = np.fromiter((f.materialIdx for f in mesh3do.faces), dtype=np.int32, count=len(mesh3do.faces))
+
+    mesh.vertices.add(len(mesh3do.vertices))
+    mesh.vertices.foreach_set('co', np.array(mesh3do.vertices, dtype=np.float32).ravel())
+    mesh.loops.add(num_loops)
+    mesh.loops.foreach_set('vertex_index', loop_vidxs)
+    mesh.polygons.add(len(face_sizes))
+    loop_starts = np.zeros_like(face_sizes) # int32, so foreach_set can copy the buffer directly
+    np.cumsum(face_sizes[:-1], out=loop_starts[1:])
+    mesh.polygons.foreach_set('loop_start', loop_starts)
+    if multi_mat:
+        mesh.polygons.foreach_set('material_index', mat_slots[face_mat_idxs])
+    mesh.shade_flat() # Polygons added by polygons.add() are smooth, 3DO meshes are imported flat shaded
+
+    # Set face uv map and vertices color
+    uvs = np.array(mesh3do.uvs, dtype=np.float32).reshape((-1, 2))
+    if np.any(loop_uvidxs >= len(uvs)):
+        print(f"Warning: UV index out of range {loop_uvidxs.max()} >= {len(uvs)}! mesh:'{mesh3do.name}'")
+    loop_uvs = np.zeros((num_loops, 2), dtype=np.float32)
+    if len(uvs) > 0:
+        # Gather with clipped indices and zero out the invalid ones
+        valid_uvs = (loop_uvidxs > -1) & (loop_uvidxs < len(uvs))
+        loop_uvs  = np.where(valid_uvs[:, None], uvs.take(loop_uvidxs, axis=0, mode='clip'), loop_uvs)
+        if uvAbsolute:
+            loop_uvs /= np.repeat(mat_uv_sizes[face_mat_idxs], face_sizes, axis=0)
+    loop_uvs[:, 1] *= -1.0 # Note: Flipped v
+    mesh.uv_layers.new().data.foreach_set('uv', loop_uvs.ravel())
+
+    vert_color = mesh.vertex_colors.new()
+    if vertexColors:
+        colors = np.array(mesh3do.vertexColors, dtype=np.float32).reshape((-1, 4))
+        vert_color.data.foreach_set('color', colors[loop_vidxs].ravel())
+
+    # Set custom property for face type, geometry, light, texture mode and extra light
+    meshSet3doFaceLayers(mesh, mesh3do.faces)
+
+    mesh.update(calc_edges=True)
     return mesh
 
 
 
 def _create_objects_from_model(model: Model3do, uvAbsolute: bool, geosetNum: int, vertexColors: bool, importRadiusObj: bool, preserveOrder: bool):
     meshes = model.geosets[geosetNum].meshes
-    for node in model.meshHierarchy:
-        meshIdx = node.meshIdx
-
-        # Get node's mesh
-        if meshIdx > -1:
-            if meshIdx >= len(meshes):
-                raise IndexError(f"Mesh index {meshIdx} out of range ({len(meshes)})!")
-
-            mesh3do = meshes[meshIdx]
-            mesh = _make_mesh(mesh3do, uvAbsolute, vertexColors, model.materials)
-            obj = bpy.data.objects.new(mesh3do.name, mesh)
-
-            # Set mesh radius object, draw type, custom property for lighting and texture mode
-            if importRadiusObj:
-                _set_mesh_radius(obj, mesh3do.radius)
-
-            obj.display_type = getDrawType(mesh3do.geometryMode)
-            obj.sith_model3do_light_mode = mesh3do.lightMode.name
-            obj.sith_model3do_texture_mode = mesh3do.textureMode.name
-            obj.display_bounds_type = 'SPHERE'
-            bpy.context.collection.objects.link(obj)  # Use the collection method to link the object
-        else:
-            obj = bpy.data.objects.new(node.name, None)
-            obj.empty_display_size = (0.0)
-            bpy.context.collection.objects.link(obj)  # Use the collection method to link the object
-
-        # Make obj name prefixed by idx num.
-        # This will make the hierarchy of model 3do ordered by index instead by name in Blender.
-        obj.name = makeOrderedName(obj.name, node.idx, len(model.meshHierarchy)) if preserveOrder else obj.name
-
-        # Set hierarchy node flags, type, and name
-        obj.sith_model3do_hnode_idx = node.idx
-        obj.sith_model3do_hnode_name = node.name
-        obj.sith_model3do_hnode_flags = node.flags.hex()
-        obj.sith_model3do_hnode_type = node.type.hex()
-
-        # Set node position, rotation, and pivot
-        _set_obj_pivot(obj, node.pivot)
-        obj.location = node.position
-        _set_obj_rotation(obj, node.rotation)
-
-        node.obj = obj
-
-    bpy.context.view_layer.update()  # Use view_layer.update() instead of scene.update()
+    mat_images: Dict[int, Optional[bpy.types.Image]] = {}
+    objs: List[bpy.types.Object] = [] # linked to collection in one pass at the end
+    radius_bm = bmesh.new() if importRadiusObj else None # shared by all mesh radius objects
+    try:
+        for node in model.meshHierarchy:
+            meshIdx = node.meshIdx
+
+            # Get node's mesh
+            if meshIdx > -1:
+                if meshIdx >= len(meshes):
+                    raise IndexError(f"Mesh index {meshIdx} out of range ({len(meshes)})!")
+
+                mesh3do = meshes[meshIdx]
+                mesh = _make_mesh(mesh3do, uvAbsolute, vertexColors, model.materials, mat_images)
+                obj = bpy.data.objects.new(mesh3do.name, mesh)
+
+                # Set mesh radius object, draw type, custom property for lighting and texture mode
+                if importRadiusObj:
+                    _set_mesh_radius(obj, mesh3do.radius, radius_bm)
+
+                obj.display_type = getDrawType(mesh3do.geometryMode)
+                obj.sith_model3do_light_mode = mesh3do.lightMode.name
+                obj.sith_model3do_texture_mode = mesh3do.textureMode.name
+                obj.display_bounds_type = 'SPHERE'
+            else:
+                obj = bpy.data.objects.new(node.name, None)
+                obj.empty_display_size = (0.0)
+
+            # Make obj name prefixed by idx num.
+            # This will make the hierarchy of model 3do ordered by index instead by name in Blender.
+            obj.name = makeOrderedName(obj.name, node.idx, len(model.meshHierarchy)) if preserveOrder else obj.name
+
+            # Set hierarchy node flags, type, and name
+            obj.sith_model3do_hnode_idx = node.idx
+            obj.sith_model3do_hnode_name = node.name
+            obj.sith_model3do_hnode_flags = node.flags.hex()
+            obj.sith_model3do_hnode_type = node.type.hex()
+
+            # Set node position, rotation, and pivot
+            _set_obj_pivot(obj, node.pivot)
+            obj.location = node.position
+            _set_obj_rotation(obj, node.rotation)
+
+            node.obj = obj
+            objs.append(obj)
+    finally:
+        if radius_bm is not None:
+            radius_bm.free()
 
     # Set parent hierarchy
     for node in model.meshHierarchy:
         if node.parentIdx != -1:
             node.obj.parent_type = 'OBJECT'
             node.obj.parent = model.meshHierarchy[node.parentIdx].obj
+
+    # Link objects to the scene only when the whole hierarchy is set,
+    # so the view layer is updated once for all objects.
+    link = bpy.context.collection.objects.link
+    for obj in objs:
+        link(obj)
     bpy.context.view_layer.update()  # Use view_layer.update() instead of scene.update()
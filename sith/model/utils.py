@@ -31,6 +31,7 @@ from .model3do import (
     FaceType,
     GeometryMode,
     LightMode,
+    Mesh3doFace,
     TextureMode
 )
 
@@ -60,8 +61,11 @@ def __bmface_get_int_property(face: bmesh.types.BMFace, tag: bmesh.types.BMLayer
             return int(v)
     return default
 
+def __encode_int_property(value: int) -> bytes:
+    return str(int(value)).encode('utf-8')
+
 def __bmface_set_int_property(face: bmesh.types.BMFace, tag: bmesh.types.BMLayerItem, value: int):
-    face[tag] = str(int(value)).encode('utf-8')
+    face[tag] = __encode_int_property(value)
 
 def __bmface_get_vector4_property(face: bmesh.types.BMFace, tag: bmesh.types.BMLayerItem, default: Vector4f) -> Vector4f:
     if tag:
@@ -70,8 +74,11 @@ def __bmface_get_vector4_property(face: bmesh.types.BMFace, tag: bmesh.types.BML
             return Vector4f(*[float(c) for c in v.decode('utf8').split(',')])
     return default
 
+def __encode_vector4_property(vector: Vector4f) -> bytes:
+    return str(','.join(str(c) for c in vector)).encode('utf-8')
+
 def __bmface_set_vector4_property(face: bmesh.types.BMFace, tag: bmesh.types.BMLayerItem, vector: Vector4f):
-    face[tag] = str(','.join(str(c) for c in vector)).encode('utf-8')
+    face[tag] = __encode_vector4_property(vector)
 
 def bmMeshInit3doLayers(bm: bmesh.types.BMesh):
     bmFaceSeqGetLayerString(bm.faces, k3doFaceType,       makeLayer=True)
@@ -81,6 +88,28 @@ def bmMeshInit3doLayers(bm: bmesh.types.BMesh):
     bmFaceSeqGetLayerString(bm.faces, k3doFaceExtraLight, makeLayer=True)
     bm.faces.layers.int.verify()
 
+def meshSet3doFaceLayers(mesh: bpy.types.Mesh, faces: List[Mesh3doFace]):
+    """
+    Stores 3DO polygon face type, geometry mode, light mode, texture mode and extra light color
+    of `faces` in face layers of `mesh`, i-th face to i-th mesh polygon.
+    Layers are written as mesh face attributes directly, without converting `mesh` to `BMesh`,
+    and can be read back with `bmFaceGet*` functions.
+    """
+    def set_layer(name: str, values, encode):
+        attr = mesh.attributes.get(name) or mesh.attributes.new(name, 'STRING', 'FACE')
+        encoded = {} # faces share only a few distinct values, encode each once
+        for data, v in zip(attr.data, values):
+            e = encoded.get(v)
+            if e is None:
+                e = encoded[v] = encode(v)
+            data.value = e
+
+    set_layer(k3doFaceType,       (f.type         for f in faces), __encode_int_property)
+    set_layer(k3doGeometryMode,   (f.geometryMode for f in faces), __encode_int_property)
+    set_layer(k3doLightingMode,   (f.lightMode    for f in faces), __encode_int_property)
+    set_layer(k3doTextureMode,    (f.textureMode  for f in faces), __encode_int_property)
+    set_layer(k3doFaceExtraLight, (f.color        for f in faces), __encode_vector4_property)
+
 def bmFaceGetType(face: bmesh.types.BMFace, bm: bmesh.types.BMesh) -> FaceType:
     """
     Returns the value of 3DO polygon face type stored in layer of `BMFace`.
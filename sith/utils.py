@@ -20,8 +20,9 @@
 # SOFTWARE.
 
 import bpy, os.path
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Union, Tuple
+from typing import Dict, Optional, Union, Tuple
 
 from sith.material import ColorMap
 from sith import bl_info
@@ -29,13 +30,13 @@ from sith import bl_info
 kMaxNameLen = 64
 kDefaultCmp = 'dflt.cmp'
 
-_fsys_case_sensitive = not Path(str(Path.home()).upper()).exists()
+_fsys_case_sensitive = not os.path.exists(__file__.swapcase())
 
 def isValidNameLen(name: str):
     return len(name) <= kMaxNameLen
 
 def isASCII(s: str):
-    return all(ord(c) < 128 for c in s)
+    return s.isascii()
 
 def assertName(name: str):
     if not isValidNameLen(name):
@@ -45,34 +46,21 @@ def assertName(name: str):
         raise AssertionError(f"name error: '{name}' len does not contain all ASCII chars")
 
 def findCmpFileInPath(cmpFile: Union[Path, str], path: Union[Path, str]) -> Optional[Path]:
-    cmpFile = Path(cmpFile)
-    modelDir: Path = Path(os.path.dirname(path))
-
-    # try model folder
-    path = modelDir / cmpFile
-    if path.exists() and path.is_file():
-        return path
-
-    # try model folder / misc/cmp
-    path = modelDir / Path('misc/cmp') / cmpFile
-    if path.exists() and path.is_file():
-        return path
-
-    # try parent folder
-    path = modelDir.parent / cmpFile
-    if path.exists() and path.is_file():
-        return path
-
-    # try parent folder / misc/cmp
-    path = modelDir.parent / Path('misc/cmp') / cmpFile
-    if path.exists() and path.is_file():
-        return path
-
-    # try parent/parent folder / misc/cmp
-    path = modelDir.parent.parent / Path('misc/cmp') / cmpFile
-    if path.exists() and path.is_file():
-        return path
-
+    cmpFile     = os.fspath(cmpFile)
+    modelDir    = os.path.dirname(os.fspath(path))
+    parentDir   = os.path.dirname(modelDir)
+    grandparent = os.path.dirname(parentDir)
+
+    candidates = (
+        os.path.join(modelDir, cmpFile),                 # try model folder
+        os.path.join(modelDir, 'misc', 'cmp', cmpFile),  # try model folder / misc/cmp
+        os.path.join(parentDir, cmpFile),                # try parent folder
+        os.path.join(parentDir, 'misc', 'cmp', cmpFile), # try parent folder / misc/cmp
+        os.path.join(grandparent, 'misc', 'cmp', cmpFile) # try parent/parent folder / misc/cmp
+    )
+    for p in candidates:
+        if os.path.isfile(p):
+            return Path(p)
     return None
 
 def getCmpFileOrDefault(filepath: Union[Path, str], searchPath: Union[Path, str]) -> Optional[ColorMap]:
@@ -93,6 +81,16 @@ def getDefaultMatFolders(model3doPath: Union[Path, str]):
     path3 = os.path.join(path3, 'mat')
     return [path1, path2, path3]
 
+@lru_cache(maxsize=64)
+def _get_dir_lower_index(dirPath: str, mtime_ns: int) -> Dict[str, str]:
+    "Returns dict of lower-cased file name -> file name in dir. mtime_ns invalidates cached entry when dir changes"
+    index: Dict[str, str] = {}
+    with os.scandir(dirPath) as it:
+        for e in it:
+            if e.is_file():
+                index.setdefault(e.name.lower(), e.name)
+    return index
+
 def getFilePathInDir(filename: str, dirPath: Union[Path, str], insensitive: bool = True):
     "Returns string file path in dir if file exists otherwise None"
 
@@ -113,14 +111,32 @@ def getFilePathInDir(filename: str, dirPath: Union[Path, str], insensitive: bool
         if file_exists(filePath):
             return filePath
 
-        # Ok, now let's go through all files in folder and
-        # try to find file by case insensitive comparing it.
-        # to other file names.
-        for f in os.listdir(dirPath):
+        # Ok, now let's look up the file by case insensitive
+        # comparing it to other file names in folder.
+        dirPath = os.fspath(dirPath)
+        f = _get_dir_lower_index(dirPath, os.stat(dirPath).st_mtime_ns).get(filename)
+        if f is not None:
             filePath = os.path.join(dirPath, f)
-            if file_exists(filePath) and f.lower() == filename:
+            if file_exists(filePath):
                 return filePath
 
+_mat_lower_index: Dict[str, str] = {} # lower-cased material name -> material name
+
+def _find_material_lower(name: str) -> Optional[bpy.types.Material]:
+    # Note, index holds only names and not materials, so no RNA reference outlives the data
+    mat_name = _mat_lower_index.get(name)
+    if mat_name is not None:
+        mat = bpy.data.materials.get(mat_name)
+        if mat is not None and mat.name.lower() == name:
+            return mat
+
+    # Cache miss or stale entry, rebuild index
+    _mat_lower_index.clear()
+    for mat in bpy.data.materials:
+        _mat_lower_index.setdefault(mat.name.lower(), mat.name)
+    mat_name = _mat_lower_index.get(name)
+    return bpy.data.materials.get(mat_name) if mat_name is not None else None
+
 def getGlobalMaterial(name: str) -> Optional[bpy.types.Material]:
     if name in bpy.data.materials:
         return bpy.data.materials[name]
@@ -128,10 +144,7 @@ def getGlobalMaterial(name: str) -> Optional[bpy.types.Material]:
     name = name.lower()
     if name in bpy.data.materials:
         return bpy.data.materials[name]
-
-    for mat in bpy.data.materials:
-        if mat.name.lower() == name:
-            return mat
+    return _find_material_lower(name)
 
 def makeNewGlobalMaterial(mat_name: str) -> bpy.types.Material:
     mat = bpy.data.materials.new(name=mat_name)
@@ -149,31 +162,27 @@ def clearSceneAnimData(scene):
         ob.animation_data_clear()
 
 def clearAllScenes():
-    # Ensure all objects are unlinked from their collections
-    for scene in bpy.data.scenes:
-        for obj in scene.objects:
-            if obj.name in scene.collection.objects:
-                scene.collection.objects.unlink(obj)
-        for collection in scene.collection.children:
-            for obj in collection.objects:
-                collection.objects.unlink(obj)
-            scene.collection.children.unlink(collection)
-    
-    # Remove all objects
-    bpy.ops.object.select_all(action='SELECT')
-    bpy.ops.object.delete(use_global=False)
+    # Remove all objects, this also unlinks them from scenes and collections
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
 
     # Remove all meshes
-    bpy.ops.outliner.orphans_purge(do_local_ids=True, do_linked_ids=True, do_recursive=True)
+    for mesh in list(bpy.data.meshes):
+        bpy.data.meshes.remove(mesh)
 
     # Remove all materials
-    for material in bpy.data.materials:
+    for material in list(bpy.data.materials):
         bpy.data.materials.remove(material)
-    
+
     # Remove all collections
-    for collection in bpy.data.collections:
+    for collection in list(bpy.data.collections):
         bpy.data.collections.remove(collection)
 
+    # Purge the rest of unused data (images, textures, actions, object data...) left by removed data-blocks.
+    # Note, this is a data API call, not an operator, so it doesn't trigger scene update.
+    bpy.data.orphans_purge(do_local_ids=True, do_linked_ids=True, do_recursive=True)
+
+@lru_cache(maxsize=None)
 def getExportFileHeader(prefix: str) -> str:
     version: Tuple[int] = bl_info['version']
     verstr = '.'.join([str(v) for v in version])